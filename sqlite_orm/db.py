@@ -1,4 +1,9 @@
 import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from functools import lru_cache
 from typing import Iterable, List
 
 from sqlite_orm.fields import ForeignKeyField
@@ -6,13 +11,39 @@ from sqlite_orm.models import BaseModel
 from sqlite_orm.exceptions import dbIntegrityError, QueryError, NotFoundError, MultipleRowsReturnedError, \
     DatabaseClosedError
 from sqlite_orm import NAMESPACE_SPLIT_KEY
+from sqlite_orm.writer import Writer
+from sqlite_orm.explain import QueryPlan, PlanCollector
+
+
+def _copy_database(source, target, pages, sleep, progress=None, timeout=None):
+    """
+    sqlite3 backup from source to target connection. sqlite3 keeps retrying steps while
+    target or source is busy, so with timeout the copy is aborted from progress callback.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def on_step(status, remaining, total):
+        if progress is not None:
+            progress(status, remaining, total)
+        if deadline is not None and status != sqlite3.SQLITE_DONE and time.monotonic() > deadline:
+            raise QueryError(f'Backup did not finish in {timeout} seconds, {remaining} of {total} pages left.')
+
+    source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+
+
+@lru_cache(maxsize=None)
+def _row_class(names):
+    """namedtuple class for given column names, cached so every query with same columns shares it."""
+    return namedtuple('Row', names, rename=True)
 
 
 class Query(object):
     """Base query class with methods to filter result and retrieve it."""
 
-    def __init__(self, model):
+    def __init__(self, model, db=None):
         self.model = model
+        if db is not None:
+            self.db = db
         self.pk_db_name = self.model.pk_db_name()
         self._base_query = 'SELECT {select_fields} FROM {select_from} '
         self._select_fields = {
@@ -25,9 +56,17 @@ class Query(object):
         self._select_where = []
         # params for ? in _select_where
         self._query_params = []
-        self.limit = ''
+        # ['tablename.fieldname ASC', ...] strings
+        self._order_by = []
+        self._limit = None
         # return dicts instead of models (e.g. when we don't want to select all fields)
         self._return_dicts = False
+        # {(tablename, name): sql_expression} computed columns, e.g. search snippets
+        self._extra_fields = {}
+        # (tablename, db_name) columns used in WHERE and JOIN conditions, for index suggestions
+        self._used_columns = []
+        # None to return models/dicts, or one of 'tuples', 'namedtuples', 'scalars'
+        self._row_mode = None
 
     def make_query_with_params(self):
         """Combine all requests etc into sql query string and params."""
@@ -41,13 +80,37 @@ class Query(object):
                     for field in self._select_fields[tablename].values()
                 ]
             )
+        for (tablename, name), expression in self._extra_fields.items():
+            select_fields.append(f'{expression} AS {tablename}{NAMESPACE_SPLIT_KEY}{name}')
         query = self._base_query.format(
             select_fields=', '.join(select_fields),
             select_from=self.select_from,
         )
         if self._select_where:
-            query += f'WHERE ({select_where})'
-        return query, self._query_params
+            query += f'WHERE ({select_where}) '
+        if self._order_by:
+            query += 'ORDER BY ' + ', '.join(self._order_by) + ' '
+        if self._limit is not None:
+            query += f'LIMIT {self._limit}'
+        return query.rstrip(), self._query_params
+
+    def _execute(self, query, params, **kwargs):
+        """Run query on db, recording its plan if db collects plans."""
+        if self.db._plan_collector is not None:
+            self.db._plan_collector.add(self._explain(query, params))
+        return self.db._execute(query, params, **kwargs)
+
+    def _explain(self, query, params):
+        rows = self.db._execute('EXPLAIN QUERY PLAN ' + query, params)
+        return QueryPlan(query, params, rows, used_columns=self._used_columns, con=self.db.con)
+
+    def explain(self):
+        """
+        Return QueryPlan of the query: tree of EXPLAIN QUERY PLAN steps with warnings
+        about full scans, temporary b-trees and automatic indexes and CREATE INDEX suggestions
+        for filtered or joined columns that lack an index.
+        """
+        return self._explain(*self.make_query_with_params())
 
     def filter(self, **kwargs):
         """Filter results by kwargs where kwargs should be field for one of the queried models."""
@@ -62,39 +125,81 @@ class Query(object):
         for arg_name, value in kwargs.items():
             try:
                 # get database field name for given kwarg
+                db_name = self.model._meta['names'][arg_name]
                 self._select_where.append(where_arg.format(
                     tablename=self.model.__tablename__,
-                    fieldname=self.model._meta['names'][arg_name]
+                    fieldname=db_name,
                 ))
                 self._query_params.append(value)
+                self._used_columns.append((self.model.__tablename__, db_name))
             except KeyError:
                 raise QueryError('No such field {0} on model {1}'.format(arg_name, self.model))
         return self
 
+    def _columns(self):
+        """[(tablename, model_field_name), ...] for selected columns in the order they are queried."""
+        columns = [
+            (tablename, model_name)
+            for tablename in self._select_fields
+            for model_name in self._select_fields[tablename]
+        ]
+        return columns + list(self._extra_fields)
+
+    def tuples(self):
+        """Return rows as plain tuples in the order of selected columns."""
+        self._row_mode = 'tuples'
+        return self
+
+    def namedtuples(self):
+        """
+        Return rows as namedtuples with model field names as attributes.
+        Field names present in several selected tables are prefixed with `{tablename}_`.
+        """
+        self._row_mode = 'namedtuples'
+        return self
+
+    def scalars(self):
+        """Return value of the first selected column for each row."""
+        self._row_mode = 'scalars'
+        return self
+
+    def _fetch_rows(self, query, params):
+        """Fetch rows for tuples/namedtuples/scalars modes without building sqlite3.Row objects."""
+        rows = self._execute(query, params, as_tuples=True) or []
+        if self._row_mode == 'tuples':
+            return rows
+        if self._row_mode == 'scalars':
+            return [row[0] for row in rows]
+        columns = self._columns()
+        model_names = [model_name for _, model_name in columns]
+        names = tuple(
+            model_name if model_names.count(model_name) == 1 else f'{tablename}_{model_name}'
+            for tablename, model_name in columns
+        )
+        make_row = _row_class(names)._make
+        return [make_row(row) for row in rows]
+
     def all(self) -> List:
-        """Return all results as list with models or dicts."""
+        """Return all results as list with models, dicts or rows depending on query mode."""
         query, params = self.make_query_with_params()
-        rows = self.db._execute(query, params) or []
+        if self._row_mode is not None:
+            return self._fetch_rows(query, params)
+        rows = self._execute(query, params) or []
         if not self._return_dicts:
             fetched_models = [self.model.from_query_result(row) for row in rows]
+            # computed columns are set as plain attributes of fetched models
+            for (tablename, name) in self._extra_fields:
+                namespaced_name = f'{tablename}{NAMESPACE_SPLIT_KEY}{name}'
+                for model, row in zip(fetched_models, rows):
+                    setattr(model, name, row[namespaced_name])
             return fetched_models
-        reverse_names = {}
-        for table in self._select_fields.values():
-            for table_name, db_name in table.items():
-                reverse_names[db_name] = table_name
-        dicts_to_return = []
-        for row in rows:
-            new_dict = {}
-            for namespaced_name in row.keys():
-                tablename, field_db_name = namespaced_name.split(NAMESPACE_SPLIT_KEY)
-                new_name = tablename + '.' + reverse_names[field_db_name]
-                new_dict[new_name] = row[namespaced_name]
-            dicts_to_return.append(new_dict)
-        return dicts_to_return
+        # dict keys are worked out once per query, rows come in the same column order
+        keys = [f'{tablename}.{model_name}' for tablename, model_name in self._columns()]
+        return [dict(zip(keys, row)) for row in rows]
 
     def first(self):
         """Get first item as model or dict. Return None if no result."""
-        self.limit = 'LIMIT 1'
+        self._limit = 1
         result = self.all()
         if not result:
             return None
@@ -104,9 +209,9 @@ class Query(object):
         """Return model with specified pk."""
         self._select_where.append(f'{self.pk_db_name}=?')
         self._query_params.append(pk)
-        self.limit = 'LIMIT 1'
+        self._used_columns.append((self.model.__tablename__, self.pk_db_name))
         query, params = self.make_query_with_params()
-        rows = self.db._execute(query, params)
+        rows = self._execute(query, params)
         if len(rows) > 1:
             raise MultipleRowsReturnedError(
                 f'Expected 1 resulting row but {len(rows)} rows returned for {query} {params}'
@@ -120,6 +225,24 @@ class Query(object):
         fetched_model.needs_update_in_db = False
         return fetched_model
 
+    def order_by(self, *fields):
+        """Order results by model fields, prefix field name with '-' for descending order."""
+        for field in fields:
+            direction = 'ASC'
+            if field.startswith('-'):
+                field, direction = field[1:], 'DESC'
+            try:
+                db_name = self.model._meta['names'][field]
+            except KeyError:
+                raise QueryError(f'No field {field} on model {self.model}.')
+            self._order_by.append(f'{self.model.__tablename__}.{db_name} {direction}')
+        return self
+
+    def limit(self, n: int):
+        """Return at most n rows."""
+        self._limit = int(n)
+        return self
+
     def join(self, join_with, **kwargs):
         """
         Join table with other model.
@@ -136,21 +259,61 @@ class Query(object):
         if kwargs.get('join_on'):
             left_side_db_name = self.model._meta['names'][kwargs['join_on'][0]]
             right_side_db_name = join_with._meta['names'][kwargs['join_on'][1]]
-        self.select_from = f'{self.model.__tablename__} JOIN {join_with.__tablename__} ON ' \
-                           f'{self.model.__tablename__}.{left_side_db_name}={join_with.__tablename__}.{right_side_db_name}'
+        self._used_columns.append((self.model.__tablename__, left_side_db_name))
+        self._used_columns.append((join_with.__tablename__, right_side_db_name))
+        self.select_from += f' JOIN {join_with.__tablename__} ON ' \
+                            f'{self.model.__tablename__}.{left_side_db_name}={join_with.__tablename__}.{right_side_db_name}'
+        return self
+
+    def search(self, terms, rank=True):
+        """
+        Full-text search in searchable fields using FTS5 query syntax.
+        :param terms: FTS5 query string, e.g. 'sqlite AND orm' or 'field1: sql*'
+        :param rank: if True order results by relevance (best matches first)
+        """
+        if not self.model._meta['searchable']:
+            raise QueryError(f'Model {self.model} has no searchable fields.')
+        fts = self.model.search_table_name()
+        self.select_from += f' JOIN {fts} ON {fts}.rowid={self.model.__tablename__}.rowid'
+        self._select_where.append(f'{fts} MATCH ?')
+        self._query_params.append(terms)
+        if rank:
+            self._order_by.append(f'{fts}.rank')
+        return self
+
+    def _select_search_rank(self):
+        """Add relevance of search match as `search_rank` column, lower is better."""
+        fts = self.model.search_table_name()
+        self._extra_fields[(self.model.__tablename__, 'search_rank')] = f'{fts}.rank'
+        return self
+
+    def snippet(self, field, start='[', end=']', ellipsis='...', tokens=16):
+        """
+        Add snippet of searchable field around matched terms to results of search.
+        Snippet is available as `{field}_snippet` attribute of models or
+        `{tablename}.{field}_snippet` key of dicts.
+        """
+        fts = self.model.search_table_name()
+        if f'{fts} MATCH ?' not in self._select_where:
+            raise QueryError('snippet() can only be used after search().')
+        searchable = [*self.model._meta['searchable']]
+        if field not in searchable:
+            raise QueryError(f'Field {field} of model {self.model} is not searchable.')
+        start, end, ellipsis = (text.replace("'", "''") for text in (start, end, ellipsis))
+        self._extra_fields[(self.model.__tablename__, f'{field}_snippet')] = \
+            f"snippet({fts}, {searchable.index(field)}, '{start}', '{end}', '{ellipsis}', {int(tokens)})"
         return self
 
     def select(self, model, fields: Iterable):
         """Select kwargs fields from model."""
         if isinstance(fields, str):
             raise ValueError('fields cannot be a string, it must be a container with strings.')
-        reverse_names = {db_name: model_name for model_name, db_name in model._meta['names'].items()}
         # reset fields if there was no select before
         if not self._return_dicts:
             self._select_fields = {}
         for field in fields:
             try:
-                self._select_fields.setdefault(model.__tablename__, {})[field] = reverse_names[field]
+                self._select_fields.setdefault(model.__tablename__, {})[field] = model._meta['names'][field]
             except KeyError:
                 raise QueryError(f'No field {field} on model {model}.')
         self._return_dicts = True
@@ -160,18 +323,58 @@ class Query(object):
 class Database:
     """Class to hold connection and do db management (model creation, deletion etc.)."""
 
-    def __init__(self, filename=':memory:', verbose=False):
+    def __init__(self, filename=':memory:', verbose=False, check_same_thread=True,
+                 mirror_in_memory=False, mirror_interval=None):
+        """
+        :param filename: database file, ':memory:' for in-memory database
+        :param verbose: print executed sql
+        :param check_same_thread: passed to sqlite3.connect, set False to share connection between threads
+        :param mirror_in_memory: load file into in-memory database and run all queries there,
+            changes are written back to file by `flush` (and on close)
+        :param mirror_interval: if set, flush in-memory mirror to file every `mirror_interval` seconds
+        """
         self.filename = filename
-        self.query = Query
-        self.query.db = self
+        self.mirror_in_memory = mirror_in_memory
+        # mirror is flushed from background threads
+        self.check_same_thread = check_same_thread and not mirror_in_memory
         self.BaseModel = BaseModel
         # backref to db for foreign key support
         self.BaseModel.db = self
-        self.con = sqlite3.connect(filename)
+        self._disk_con = None
+        self._mirror_lock = threading.Lock()
+        # serializes use of self.con when background writer shares it (in-memory and mirror databases)
+        self._con_lock = threading.RLock()
+        self._mirror_stop = threading.Event()
+        if mirror_in_memory:
+            # flush retries busy steps itself, no need to block in sqlite busy handler
+            self._disk_con = sqlite3.connect(filename, check_same_thread=False, timeout=0)
+            self.con = sqlite3.connect(':memory:', check_same_thread=False)
+            self._disk_con.backup(self.con)
+            if mirror_interval:
+                threading.Thread(
+                    target=self._flush_periodically, args=(mirror_interval,), name='sqlite_orm-mirror', daemon=True,
+                ).start()
+        else:
+            self.con = sqlite3.connect(filename, check_same_thread=check_same_thread)
         self.con.row_factory = sqlite3.Row
         self.cursor = self.con.cursor()
         if verbose:
             self.con.set_trace_callback(lambda query: print(query))
+        # background writers to close together with database
+        self._writers = []
+        # PlanCollector recording plans of executed queries, see `collect_plans`
+        self._plan_collector = None
+
+    def query(self, model):
+        """Start a query for model bound to this database."""
+        return Query(model, db=self)
+
+    def collect_plans(self):
+        """
+        Context manager recording plans of all queries run while it is active.
+        Use `collector.flagged()` and `collector.index_suggestions()` afterwards.
+        """
+        return PlanCollector(self)
 
     def create_all(self, raise_if_exists=False):
         """
@@ -182,30 +385,52 @@ class Database:
             model.table_definition_sql(raise_if_exists=raise_if_exists)
             for model in self.BaseModel.registered_models
         )
+        existing_tables = {row[0] for row in self._execute("SELECT name FROM sqlite_master WHERE type='table'")}
         try:
             self.cursor.executescript(sql)
         except sqlite3.OperationalError as e:
             raise dbIntegrityError(e)
+        # new search index for a table that already has rows is empty, triggers only index new writes
+        for model in self.BaseModel.registered_models:
+            if model._meta['searchable'] and model.search_table_name() not in existing_tables:
+                self.rebuild_search_index(model)
         self.con.commit()
+        # same for summary of a table that already has rows, triggers only count new writes
+        for model in self.BaseModel.registered_models:
+            if model.__summary_of__ is not None and model.__tablename__ not in existing_tables:
+                self.refresh(model)
+
+    def rebuild_search_index(self, model):
+        """Reindex all rows of model table in its full-text search table."""
+        if not model._meta['searchable']:
+            raise QueryError(f'Model {model} has no searchable fields.')
+        fts = model.search_table_name()
+        self._execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')", commit=True)
 
-    def _execute(self, sql, params=None, commit=False):
+    def _execute(self, sql, params=None, commit=False, as_tuples=False):
         """
         Execute raw sql.
         :param sql: SQL string.
         :param params: params for ? in sql string
         :param commit: if True issue COMMIT after transaction
+        :param as_tuples: if True fetch plain tuples instead of sqlite3.Row
         """
         sql = sql+';' if not sql.endswith(';') else sql
+        cursor = self.cursor
+        if as_tuples:
+            cursor = self.con.cursor()
+            cursor.row_factory = None
         try:
-            if not params:
-                self.cursor.execute(sql)
+            with self._con_lock:
+                if not params:
+                    cursor.execute(sql)
+                    if commit:
+                        self.con.commit()
+                    return cursor.fetchall()
+                cursor.execute(sql, params)
                 if commit:
                     self.con.commit()
-                return self.cursor.fetchall()
-            self.cursor.execute(sql, params)
-            if commit:
-                self.con.commit()
-            return self.cursor.fetchall()
+                return cursor.fetchall()
         except sqlite3.OperationalError as e:
             raise QueryError(e)
 
@@ -270,16 +495,134 @@ class Database:
         )
         return sql, values
 
+    def writer(self, max_batch=100, max_delay_ms=5):
+        """
+        Start background writer that commits queued models and statements in batches.
+        :param max_batch: max number of writes committed in one transaction
+        :param max_delay_ms: how long writer waits for more writes before committing
+        """
+        writer = Writer(self, max_batch=max_batch, max_delay_ms=max_delay_ms)
+        self._writers.append(writer)
+        return writer
+
+    def _writer_connection(self):
+        """
+        Connection for background writer thread and whether writer should close it.
+        Shared connection is used under `_con_lock` by both writer and `_execute`, so a batch
+        is never committed half-way by a caller, but statements a caller executed without
+        commit are committed together with next writer batch.
+        """
+        if self.filename == ':memory:' or self.mirror_in_memory:
+            # in-memory database is private to its connection so writer has to share it
+            if self.check_same_thread:
+                raise ValueError('Background writer for in-memory database needs check_same_thread=False.')
+            return self.con, False
+        return sqlite3.connect(self.filename, check_same_thread=False), True
+
+    def refresh(self, model):
+        """Rebuild summary model table from its source table."""
+        if model.__summary_of__ is None:
+            raise QueryError(f'Model {model} is not a summary model.')
+        try:
+            self.cursor.executescript(f'BEGIN; {model.summary_refresh_sql()} COMMIT;')
+        except sqlite3.OperationalError as e:
+            self.con.rollback()
+            raise QueryError(e)
+
     def drop(self, model):
         """Drop table corresponding to model."""
+        if model.__summary_of__ is not None:
+            # triggers live on source table and would fail without summary table
+            for trigger in model.summary_trigger_names():
+                self._execute(f'DROP TRIGGER IF EXISTS {trigger}', commit=True)
+        if model._meta['searchable']:
+            self._execute(f'DROP TABLE IF EXISTS {model.search_table_name()}', commit=True)
         sql = f'DROP TABLE IF EXISTS {model.__tablename__}'
         return self._execute(sql, commit=True)
 
+    def backup(self, target, pages_per_step=100, sleep=0.25, progress=None, timeout=None):
+        """
+        Copy database to target in background without blocking writers for the whole copy.
+        :param target: filename, sqlite3.Connection or Database to copy to
+        :param pages_per_step: number of pages copied at a time, -1 to copy everything at once
+        :param sleep: seconds to sleep between steps, lets other connections write meanwhile
+        :param progress: callable(status, remaining, total) called after every step
+        :param timeout: seconds after which unfinished backup fails with QueryError, None to wait
+        :return: concurrent.futures.Future resolved when backup is done
+        """
+        future = Future()
+        args = (future, target, pages_per_step, sleep, progress, timeout)
+        if self.filename == ':memory:' and self.check_same_thread \
+                or isinstance(target, Database) and target.check_same_thread:
+            # connection cannot be used from another thread, copy right away
+            self._backup(*args)
+            return future
+        thread = threading.Thread(
+            target=self._backup, args=args,
+            name='sqlite_orm-backup', daemon=True,
+        )
+        thread.start()
+        return future
+
+    def _backup(self, future, target, pages_per_step, sleep, progress, timeout):
+        # file database is copied through its own connection so this one stays free for queries
+        own_source = self.filename != ':memory:' and not self.mirror_in_memory
+        own_target = isinstance(target, str)
+        source = sqlite3.connect(self.filename) if own_source else self.con
+        try:
+            if own_target:
+                target = sqlite3.connect(target)
+            elif isinstance(target, Database):
+                target = target.con
+            _copy_database(source, target, pages_per_step, sleep, progress=progress, timeout=timeout)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+        finally:
+            if own_source:
+                source.close()
+            if own_target and isinstance(target, sqlite3.Connection):
+                target.close()
+
+    def flush(self, timeout=10):
+        """
+        Write in-memory mirror back to database file.
+        :param timeout: seconds to wait for database file to become writable
+        """
+        if not self.mirror_in_memory:
+            return
+        with self._mirror_lock, self._con_lock:
+            # sqlite cannot finish copy of connection with open transaction, it would retry forever
+            if self.con.in_transaction:
+                raise QueryError('Commit or rollback pending changes before flushing mirror.')
+            _copy_database(self.con, self._disk_con, -1, 0.05, timeout=timeout)
+
+    def _flush_periodically(self, interval):
+        while not self._mirror_stop.wait(interval):
+            try:
+                self.flush()
+            except (sqlite3.Error, QueryError):
+                # pending transaction or file locked by other connection, try again next time
+                continue
+
     def close(self):
-        """Close cursor and connection."""
+        """Close writers, flush in-memory mirror and close cursor and connection."""
+        for writer in self._writers:
+            writer.close()
         try:
-            self.cursor.close()
-            self.con.close()
+            try:
+                if self.mirror_in_memory:
+                    self._mirror_stop.set()
+                    # uncommitted changes are discarded on close like for file database
+                    self.con.rollback()
+                    self.flush()
+            finally:
+                # connections are closed even if last flush failed, its error is raised after that
+                if self.mirror_in_memory:
+                    self._disk_con.close()
+                self.cursor.close()
+                self.con.close()
         except sqlite3.ProgrammingError:
             raise DatabaseClosedError('Database is already closed')
 
@@ -0,0 +1,178 @@
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+# 'SCAN new_table', 'SCAN TABLE new_table' (sqlite < 3.36), 'SEARCH new_table USING ...'
+TABLE_RE = re.compile(r'^(?:SCAN|SEARCH) (?:TABLE )?(\w+)')
+
+
+class PlanNode:
+    """One row of EXPLAIN QUERY PLAN output with its children."""
+
+    def __init__(self, id, parent, detail):
+        self.id = id
+        self.parent = parent
+        self.detail = detail
+        self.children = []
+
+    @property
+    def table(self):
+        """Table scanned or searched by this step, None for other steps."""
+        match = TABLE_RE.match(self.detail)
+        if match and not self.detail.startswith('SCAN CONSTANT ROW'):
+            return match.group(1)
+        return None
+
+    @property
+    def full_scan(self):
+        """True if step reads the whole table (or whole index)."""
+        return self.detail.startswith('SCAN ') and self.table is not None \
+            and 'VIRTUAL TABLE' not in self.detail
+
+    @property
+    def temp_btree(self):
+        """True if sqlite builds temporary b-tree for ORDER BY, GROUP BY or DISTINCT."""
+        return 'TEMP B-TREE' in self.detail
+
+    @property
+    def automatic_index(self):
+        """True if sqlite builds throwaway index for this query, i.e. a permanent one is missing."""
+        return 'AUTOMATIC' in self.detail and 'INDEX' in self.detail
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def __repr__(self):
+        return f'PlanNode({self.detail!r})'
+
+
+def indexed_columns(con, table) -> Set[str]:
+    """Columns of table that lead some index (including INTEGER PRIMARY KEY rowid alias)."""
+    columns = {'rowid'}
+    for row in con.execute(f'PRAGMA table_info({table})'):
+        # cid, name, type, notnull, default, pk
+        if row[5] and row[2].upper() == 'INTEGER':
+            columns.add(row[1])
+    for index in con.execute(f'PRAGMA index_list({table})').fetchall():
+        # seq, name, unique, ...
+        info = con.execute(f'PRAGMA index_info({index[1]})').fetchall()
+        if info:
+            # seqno, cid, name; only leading column of index helps lookups by that column
+            columns.add(info[0][2])
+    return columns
+
+
+class QueryPlan:
+    """
+    Parsed EXPLAIN QUERY PLAN of a query.
+    :param sql: explained query
+    :param params: query params
+    :param rows: EXPLAIN QUERY PLAN rows (id, parent, notused, detail)
+    :param used_columns: (tablename, column) pairs used in WHERE and JOIN conditions
+    :param con: connection to look up existing indexes for index suggestions
+    """
+
+    def __init__(self, sql, params, rows, used_columns: Iterable[Tuple[str, str]] = (), con=None):
+        self.sql = sql
+        self.params = params
+        self.used_columns = list(dict.fromkeys(used_columns))
+        self.roots = []
+        nodes: Dict[int, PlanNode] = {}
+        for id, parent, _, detail in rows:
+            node = PlanNode(id, parent, detail)
+            nodes[id] = node
+            if parent in nodes:
+                nodes[parent].children.append(node)
+            else:
+                self.roots.append(node)
+        self.index_suggestions = self._suggest_indexes(con) if con is not None else []
+
+    @property
+    def nodes(self) -> List[PlanNode]:
+        return [node for root in self.roots for node in root.walk()]
+
+    @property
+    def warnings(self) -> List[str]:
+        """Human readable notes about plan steps that are likely to be slow."""
+        warnings = []
+        for node in self.nodes:
+            if node.full_scan:
+                warnings.append(f'full scan of {node.table}: {node.detail}')
+            if node.temp_btree:
+                warnings.append(f'temporary b-tree: {node.detail}')
+            if node.automatic_index:
+                warnings.append(f'automatic index: {node.detail}')
+        return warnings
+
+    def _suggest_indexes(self, con):
+        """CREATE INDEX statements for filtered/joined columns of scanned tables that lack an index."""
+        suggestions = []
+        indexed = {}
+        for node in self.nodes:
+            if not (node.full_scan or node.automatic_index):
+                continue
+            for table, column in self.used_columns:
+                if table != node.table:
+                    continue
+                if table not in indexed:
+                    indexed[table] = indexed_columns(con, table)
+                if column in indexed[table]:
+                    continue
+                suggestion = f'CREATE INDEX IF NOT EXISTS {table}_{column}_idx ON {table}({column});'
+                if suggestion not in suggestions:
+                    suggestions.append(suggestion)
+        return suggestions
+
+    def __str__(self):
+        lines = [self.sql]
+
+        def add_lines(node, depth):
+            lines.append('  ' * depth + '|--' + node.detail)
+            for child in node.children:
+                add_lines(child, depth + 1)
+
+        for root in self.roots:
+            add_lines(root, 0)
+        return '\n'.join(lines)
+
+
+class PlanCollector:
+    """
+    Records plans of all queries run through Query while active, use as context manager:
+
+        with db.collect_plans() as collector:
+            run_load()
+        print(collector.index_suggestions())
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.plans: List[QueryPlan] = []
+        # collector that was active before this one, restored on exit
+        self._previous = None
+
+    def add(self, plan: QueryPlan):
+        self.plans.append(plan)
+        # outer collector keeps recording while nested one is active
+        if self._previous is not None:
+            self._previous.add(plan)
+
+    def flagged(self) -> List[QueryPlan]:
+        """Recorded plans with warnings."""
+        return [plan for plan in self.plans if plan.warnings]
+
+    def index_suggestions(self) -> List[str]:
+        """Unique CREATE INDEX suggestions of all recorded plans."""
+        return list(dict.fromkeys(
+            suggestion for plan in self.plans for suggestion in plan.index_suggestions
+        ))
+
+    def __enter__(self):
+        self._previous = self.db._plan_collector
+        self.db._plan_collector = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db._plan_collector = self._previous
+        self._previous = None
@@ -56,6 +56,18 @@ class TextField(BaseField):
     SQL_TYPE = 'TEXT'
     PYTHON_TYPE = str
 
+    def __init__(self, name=None, pk=False, unique=False, searchable=False):
+        """
+        :param searchable: if True field is indexed in FTS5 full-text search table for the model
+        """
+        self.searchable = searchable
+        super().__init__(name=name, pk=pk, unique=unique)
+
+    def __set_name__(self, owner, name):
+        super().__set_name__(owner, name)
+        if self.searchable:
+            owner._meta['searchable'][self.model_name] = self.db_name
+
 
 class IntField(BaseField):
     SQL_TYPE = 'INTEGER'
@@ -72,6 +84,29 @@ class BytesField(BaseField):
     PYTHON_TYPE = bytes
 
 
+class AggregateField(BaseField):
+    """Base for fields of summary models that are maintained by triggers on source model table."""
+
+    def get_sql(self):
+        return super().get_sql() + ' NOT NULL DEFAULT 0'
+
+
+class CountField(AggregateField):
+    """Number of source rows in group."""
+    SQL_TYPE = 'INTEGER'
+    PYTHON_TYPE = int
+
+
+class SumField(AggregateField):
+    """Sum of source model field `of` in group."""
+    SQL_TYPE = 'NUMERIC'
+    PYTHON_TYPE = (int, float)
+
+    def __init__(self, of, name=None):
+        self.of = of
+        super().__init__(name=name)
+
+
 class ForeignKeyField(BaseField):
     SQL_TYPE = ''
     PYTHON_TYPE = ''
@@ -1,5 +1,5 @@
 from sqlite_orm.exceptions import dbIntegrityError
-from sqlite_orm.fields import ForeignKeyField
+from sqlite_orm.fields import ForeignKeyField, CountField, SumField
 from sqlite_orm import NAMESPACE_SPLIT_KEY
 
 
@@ -13,11 +13,16 @@ class BaseModel:
         'pks': {},
         'uniques': {},
         'fks': {},
+        # text fields indexed for full-text search
+        'searchable': {},
         # sql types
         'types': [],
     }
     # registry of all models ever subclassed from BaseModel
     registered_models = []
+    # for summary models: source model and its field to group by, see `summary_triggers_sql`
+    __summary_of__ = None
+    __group_by__ = ''
 
     def __init__(self, **kwargs):
         if not self.__class__.__tablename__:
@@ -49,6 +54,7 @@ class BaseModel:
             'pks': {},
             'uniques': {},
             'fks': {},
+            'searchable': {},
         }
 
     @classmethod
@@ -140,4 +146,109 @@ class BaseModel:
         if not raise_if_exists:
             condition = 'IF NOT EXISTS '
         query = f'CREATE TABLE {condition}{cls.__tablename__} ({fields_sql});'
+        if cls._meta['searchable']:
+            query += ' ' + cls.search_table_sql(raise_if_exists=raise_if_exists)
+        if cls.__summary_of__ is not None:
+            query += ' ' + cls.summary_triggers_sql(raise_if_exists=raise_if_exists)
         return query
+
+    @classmethod
+    def search_table_name(cls):
+        """Name of FTS5 table that indexes searchable fields."""
+        return f'{cls.__tablename__}_fts'
+
+    @classmethod
+    def search_table_sql(cls, raise_if_exists=False):
+        """
+        SQL to create external content FTS5 table for searchable fields
+        and triggers that keep it in sync with model table.
+        """
+        fts = cls.search_table_name()
+        condition = '' if raise_if_exists else 'IF NOT EXISTS '
+        columns = ', '.join(cls._meta['searchable'].values())
+        new_values = ', '.join(f'new.{column}' for column in cls._meta['searchable'].values())
+        old_values = ', '.join(f'old.{column}' for column in cls._meta['searchable'].values())
+        insert = f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values});'
+        delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});"
+        return ' '.join([
+            f"CREATE VIRTUAL TABLE {condition}{fts} USING fts5({columns}, content='{cls.__tablename__}');",
+            f'CREATE TRIGGER {condition}{fts}_insert AFTER INSERT ON {cls.__tablename__} BEGIN {insert} END;',
+            f'CREATE TRIGGER {condition}{fts}_delete AFTER DELETE ON {cls.__tablename__} BEGIN {delete} END;',
+            f'CREATE TRIGGER {condition}{fts}_update AFTER UPDATE ON {cls.__tablename__} '
+            f'BEGIN {delete} {insert} END;',
+        ])
+
+    @classmethod
+    def _summary_columns(cls):
+        """
+        Summary model columns mapped to source table: (group key column, source group by column,
+        [(aggregate column, source column or None for count), ...]).
+        """
+        source = cls.__summary_of__
+        if cls.pk_db_name() == 'rowid':
+            raise ValueError(f'Summary model {cls} needs pk field to store {cls.__group_by__} values.')
+        if cls.__group_by__ not in source._meta['names']:
+            raise ValueError(f'No field {cls.__group_by__} on model {source} to group by.')
+        aggregates = []
+        for fieldname in cls._meta['names'].keys():
+            field = getattr(cls, fieldname)
+            if isinstance(field, SumField):
+                aggregates.append((field.db_name, source._meta['names'][field.of]))
+            elif isinstance(field, CountField):
+                aggregates.append((field.db_name, None))
+        return cls.pk_db_name(), source._meta['names'][cls.__group_by__], aggregates
+
+    @classmethod
+    def summary_trigger_names(cls):
+        return [f'{cls.__tablename__}_{action}' for action in ('insert', 'delete', 'update')]
+
+    @classmethod
+    def summary_triggers_sql(cls, raise_if_exists=False):
+        """
+        SQL to create triggers on source model table that incrementally update summary table
+        on every INSERT, UPDATE and DELETE.
+        """
+        key, group_by, aggregates = cls._summary_columns()
+        table, source_table = cls.__tablename__, cls.__summary_of__.__tablename__
+        counts = [column for column, source_column in aggregates if source_column is None]
+
+        def apply(row, sign):
+            """Statements adding (sign '+') or removing (sign '-') row of source table from summary."""
+            changes = ', '.join(
+                f'{column} = {column} {sign} 1' if source_column is None
+                else f'{column} = {column} {sign} coalesce({row}.{source_column}, 0)'
+                for column, source_column in aggregates
+            )
+            statements = []
+            if sign == '+':
+                statements.append(f'INSERT OR IGNORE INTO {table}({key}) SELECT {row}.{group_by} '
+                                  f'WHERE {row}.{group_by} IS NOT NULL;')
+            if changes:
+                statements.append(f'UPDATE {table} SET {changes} WHERE {key} = {row}.{group_by};')
+            if sign == '-' and counts:
+                statements.append(f'DELETE FROM {table} WHERE {key} = {row}.{group_by} AND {counts[0]} = 0;')
+            return ' '.join(statements)
+
+        condition = '' if raise_if_exists else 'IF NOT EXISTS '
+        insert_trigger, delete_trigger, update_trigger = cls.summary_trigger_names()
+        return ' '.join([
+            f'CREATE TRIGGER {condition}{insert_trigger} AFTER INSERT ON {source_table} '
+            f'BEGIN {apply("new", "+")} END;',
+            f'CREATE TRIGGER {condition}{delete_trigger} AFTER DELETE ON {source_table} '
+            f'BEGIN {apply("old", "-")} END;',
+            f'CREATE TRIGGER {condition}{update_trigger} AFTER UPDATE ON {source_table} '
+            f'BEGIN {apply("old", "-")} {apply("new", "+")} END;',
+        ])
+
+    @classmethod
+    def summary_refresh_sql(cls):
+        """SQL to rebuild summary table from scratch with GROUP BY over source table."""
+        key, group_by, aggregates = cls._summary_columns()
+        columns = ', '.join([key] + [column for column, _ in aggregates])
+        values = ', '.join([group_by] + [
+            'COUNT(*)' if source_column is None else f'coalesce(SUM({source_column}), 0)'
+            for _, source_column in aggregates
+        ])
+        return f'DELETE FROM {cls.__tablename__}; ' \
+               f'INSERT INTO {cls.__tablename__}({columns}) SELECT {values} ' \
+               f'FROM {cls.__summary_of__.__tablename__} WHERE {group_by} IS NOT NULL GROUP BY {group_by};'
@@ -0,0 +1,326 @@
+import bisect
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Sequence
+
+from sqlite_orm.db import Database, _row_class
+from sqlite_orm.exceptions import NotFoundError, MultipleRowsReturnedError, QueryError, dbIntegrityError
+from sqlite_orm.models import BaseModel
+
+
+class HashShardKey:
+    """Route rows by a stable hash of the shard key field value."""
+
+    def __init__(self, field):
+        self.field = field
+
+    def shard_for(self, value, n_shards):
+        # values sqlite treats as equal (1, 1.0, True) go to the same shard
+        if isinstance(value, bool) or isinstance(value, float) and value.is_integer():
+            value = int(value)
+        # builtin hash() is salted per process for str/bytes, crc32 keeps routing stable between runs
+        return zlib.crc32(repr(value).encode('utf-8')) % n_shards
+
+
+class RangeShardKey:
+    """
+    Route rows by ranges of the shard key field value.
+    :param bounds: sorted split points, value < bounds[0] goes to shard 0,
+        bounds[0] <= value < bounds[1] to shard 1 and so on. Needs len(shards) - 1 bounds.
+    """
+
+    def __init__(self, field, bounds: Sequence):
+        self.field = field
+        self.bounds = list(bounds)
+
+    def shard_for(self, value, n_shards):
+        if len(self.bounds) != n_shards - 1:
+            raise ValueError(f'{len(self.bounds)} bounds given for {n_shards} shards.')
+        return bisect.bisect_right(self.bounds, value)
+
+
+class ShardedQuery:
+    """
+    Query that is run on every shard (or just one if filtered by shard key) and merged.
+    Calls are recorded and replayed on a plain Query for each shard.
+    """
+
+    def __init__(self, sharded_db, model):
+        self.sharded_db = sharded_db
+        self.model = model
+        # (method_name, args, kwargs) to replay on every shard query
+        self._calls = []
+        # shard indexes to run query on, None means all shards
+        self._shards = None
+        # [(model_field_name, descending), ...]
+        self._order_by = []
+        self._limit = None
+        self._return_dicts = False
+        self._row_mode = None
+        # ranked search selects helper search_rank column
+        self._ranked = False
+
+    def _record(self, method_name, *args, **kwargs):
+        self._calls.append((method_name, args, kwargs))
+        return self
+
+    def filter(self, **kwargs):
+        """Filter results, query only runs on one shard if shard key is among kwargs."""
+        shard_key = getattr(self.model, '__shard_key__', None)
+        if shard_key is not None and shard_key.field in kwargs:
+            shard = self.sharded_db.shard_index(self.model, kwargs[shard_key.field])
+            self._shards = {shard} if self._shards is None else self._shards & {shard}
+        return self._record('filter', **kwargs)
+
+    def join(self, join_with, **kwargs):
+        """Join with other model, rows of joined models should live on the same shard."""
+        return self._record('join', join_with, **kwargs)
+
+    def select(self, model, fields: Iterable):
+        self._return_dicts = True
+        return self._record('select', model, fields)
+
+    def search(self, terms, rank=True):
+        """
+        Full-text search on every shard. Ranked search also selects relevance of every row
+        to merge shards by it, that column is removed from merged results.
+        """
+        self._record('search', terms, rank=rank)
+        if rank:
+            self._record('_select_search_rank')
+            self._order_by.append(('search_rank', False))
+            self._ranked = True
+        return self
+
+    def snippet(self, field, **kwargs):
+        return self._record('snippet', field, **kwargs)
+
+    def order_by(self, *fields):
+        for field in fields:
+            if field.startswith('-'):
+                self._order_by.append((field[1:], True))
+            else:
+                self._order_by.append((field, False))
+        return self._record('order_by', *fields)
+
+    def limit(self, n: int):
+        # every shard returns at most n rows, merged result is cut to n again
+        self._limit = int(n)
+        return self._record('limit', n)
+
+    def _shard_queries(self):
+        shards = self.sharded_db.shards
+        indexes = sorted(self._shards) if self._shards is not None else range(len(shards))
+        queries = []
+        for index in indexes:
+            query = shards[index].query(self.model)
+            query._shard_index = index
+            for method_name, args, kwargs in self._calls:
+                getattr(query, method_name)(*args, **kwargs)
+            queries.append(query)
+        return queries
+
+    def tuples(self):
+        self._row_mode = 'tuples'
+        return self._record('tuples')
+
+    def namedtuples(self):
+        self._row_mode = 'namedtuples'
+        return self._record('namedtuples')
+
+    def scalars(self):
+        self._row_mode = 'scalars'
+        return self._record('scalars')
+
+    def _sort_value_getter(self, field, columns, row_mode):
+        """Function to get value of model field from a result in given result mode."""
+        if row_mode is None and not self._return_dicts:
+            if field == 'search_rank':
+                return lambda result: result.search_rank
+            db_name = self.model._meta['names'][field]
+            if db_name in self.model._meta['fks'].values():
+                return lambda result: result._data.get('fk_to_id')
+            return lambda result: result._data[db_name]
+        column = (self.model.__tablename__, field)
+        if column not in columns:
+            raise QueryError(f'Cannot merge shards ordered by {field}, it is not selected.')
+        if row_mode is None:
+            key = f'{self.model.__tablename__}.{field}'
+            return lambda result: result[key]
+        index = columns.index(column)
+        return lambda result: result[index]
+
+    def _run_on_shard(self, query):
+        results = query.all()
+        if self._row_mode is None and not self._return_dicts:
+            for model in results:
+                model._shard_index = query._shard_index
+        return results
+
+    def all(self) -> List:
+        """Return merged results of all involved shards."""
+        queries = self._shard_queries()
+        row_mode = self._row_mode
+        if row_mode == 'scalars' and self._order_by:
+            # scalars keep only first column, merge fetches tuples to sort by other columns
+            row_mode = 'tuples'
+            for query in queries:
+                query._row_mode = row_mode
+        results = []
+        for shard_results in self.sharded_db._map(self._run_on_shard, queries):
+            results.extend(shard_results)
+        if not results:
+            return results
+        columns = queries[0]._columns()
+        # stable sort from least significant field, NULLs go first like in sqlite
+        for field, descending in reversed(self._order_by):
+            get_value = self._sort_value_getter(field, columns, row_mode)
+            results.sort(
+                key=lambda result: (get_value(result) is not None, get_value(result)),
+                reverse=descending,
+            )
+        if self._limit is not None:
+            results = results[:self._limit]
+        if self._ranked:
+            results = self._without_rank(results, columns, row_mode)
+        if row_mode != self._row_mode:
+            results = [row[0] for row in results]
+        return results
+
+    def _without_rank(self, results, columns, row_mode):
+        """Remove helper search_rank column so results look like results of a single database."""
+        if row_mode is None and not self._return_dicts:
+            for model in results:
+                del model.search_rank
+            return results
+        if row_mode is None:
+            key = f'{self.model.__tablename__}.search_rank'
+            for result in results:
+                del result[key]
+            return results
+        index = columns.index((self.model.__tablename__, 'search_rank'))
+        rows = [row[:index] + row[index + 1:] for row in results]
+        if row_mode == 'namedtuples':
+            fields = results[0]._fields
+            make_row = _row_class(fields[:index] + fields[index + 1:])._make
+            rows = [make_row(row) for row in rows]
+        return rows
+
+    def first(self):
+        """Get first item as model or dict. Return None if no result."""
+        self.limit(1)
+        result = self.all()
+        if not result:
+            return None
+        return result[0]
+
+    def get(self, pk):
+        """Return model with specified pk, looking in every shard unless model is sharded by pk."""
+        shard_key = getattr(self.model, '__shard_key__', None)
+        if shard_key is not None and shard_key.field in self.model._meta['pks']:
+            index = self.sharded_db.shard_index(self.model, pk)
+            query = self.sharded_db.shards[index].query(self.model)
+            query._shard_index = index
+            queries = [query]
+        else:
+            queries = self._shard_queries()
+
+        def get_or_none(query):
+            try:
+                model = query.get(pk)
+            except NotFoundError:
+                return None
+            model._shard_index = query._shard_index
+            return model
+
+        found = [model for model in self.sharded_db._map(get_or_none, queries) if model is not None]
+        if len(found) > 1:
+            raise MultipleRowsReturnedError(f'pk {pk} for {self.model} found in {len(found)} shards')
+        elif not found:
+            raise NotFoundError(f'No results for pk {pk} for {self.model} in any shard')
+        return found[0]
+
+
+class ShardedDatabase:
+    """
+    Route models between several Database instances (one file each).
+    Model declares shard key with `__shard_key__ = HashShardKey('field')` or
+    `__shard_key__ = RangeShardKey('field', bounds=[...])`, models without it live on first shard.
+    Every shard hands out its own auto increment pks, so sharded models need pk field
+    and its value has to be set before model is added. Shard key value must not change
+    after model is stored.
+    """
+
+    def __init__(self, filenames: Sequence[str], verbose=False):
+        if not filenames:
+            raise ValueError('At least one shard filename is required.')
+        # connections are used from executor threads when fanning out queries
+        self.shards = [
+            Database(filename, verbose=verbose, check_same_thread=False) for filename in filenames
+        ]
+        self.BaseModel = BaseModel
+        # backref to db for foreign key support, must point to router instead of last shard
+        self.BaseModel.db = self
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards))
+
+    def shard_index(self, model_cls, value) -> int:
+        """Index of shard where model_cls rows with shard key `value` are stored."""
+        shard_key = getattr(model_cls, '__shard_key__', None)
+        if shard_key is None:
+            return 0
+        if isinstance(value, BaseModel):
+            value = value.pk
+        if value is None:
+            raise ValueError(f'Shard key {shard_key.field} is not set for {model_cls}')
+        index = shard_key.shard_for(value, len(self.shards))
+        if not 0 <= index < len(self.shards):
+            raise ValueError(f'Shard key value {value} routed out of {len(self.shards)} shards.')
+        return index
+
+    def shard_for(self, model_cls, value) -> Database:
+        return self.shards[self.shard_index(model_cls, value)]
+
+    def _map(self, func, items):
+        """Run func for every item, in parallel when there is more than one."""
+        items = list(items)
+        if len(items) == 1:
+            return [func(items[0])]
+        return list(self._executor.map(func, items))
+
+    def query(self, model):
+        return ShardedQuery(self, model)
+
+    def create_all(self, raise_if_exists=False):
+        """Create tables for all registered models on every shard."""
+        self._map(lambda shard: shard.create_all(raise_if_exists=raise_if_exists), self.shards)
+
+    def add(self, model):
+        """Insert or update model on the shard picked by its shard key."""
+        shard_key = getattr(model.__class__, '__shard_key__', None)
+        value = getattr(model, shard_key.field) if shard_key is not None else None
+        index = self.shard_index(model.__class__, value)
+        if shard_key is not None:
+            if model.pk_db_name() == 'rowid':
+                raise ValueError(f'Sharded model {model.__class__} needs pk field, rowids collide between shards.')
+            if model.pk is None:
+                raise ValueError(f'Set pk of {model} before adding it, auto increment pks collide between shards.')
+            # set for models added or fetched through router
+            stored_index = getattr(model, '_shard_index', index)
+            if stored_index != index:
+                raise dbIntegrityError(
+                    f'Shard key {shard_key.field} of {model} changed, it is stored on shard {stored_index} '
+                    f'but now routes to shard {index}.'
+                )
+        self.shards[index].add(model)
+        model._shard_index = index
+        return model
+
+    def drop(self, model):
+        """Drop table corresponding to model on every shard."""
+        self._map(lambda shard: shard.drop(model), self.shards)
+
+    def close(self):
+        """Close every shard."""
+        self._executor.shutdown()
+        for shard in self.shards:
+            shard.close()
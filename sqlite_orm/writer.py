@@ -0,0 +1,186 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlite_orm.exceptions import DatabaseClosedError, QueryError, dbIntegrityError
+
+
+class Writer:
+    """
+    Background writer that owns a write connection and commits queued writes in batches.
+    Producers get futures instead of waiting for each commit, every batch is one transaction.
+    :param db: Database to write to.
+    :param max_batch: max number of writes committed in one transaction.
+    :param max_delay_ms: how long to wait for more writes before committing a non-full batch.
+    """
+
+    # queue item kinds
+    _MODEL = 'model'
+    _SQL = 'sql'
+    _FLUSH = 'flush'
+    _STOP = 'stop'
+
+    def __init__(self, db, max_batch=100, max_delay_ms=5):
+        if max_batch < 1:
+            raise ValueError('max_batch should be at least 1.')
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        # makes closed check and enqueueing atomic, so nothing is queued after stop marker
+        self._lock = threading.Lock()
+        self._con, self._owns_con = db._writer_connection()
+        # connection shared with db is only used under db lock, own connection needs no locking
+        self._con_lock = threading.Lock() if self._owns_con else db._con_lock
+        self._thread = threading.Thread(target=self._run, name='sqlite_orm-writer', daemon=True)
+        self._thread.start()
+
+    def _put(self, kind, *args):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise DatabaseClosedError('Writer is closed')
+            self._queue.put((kind, future, args))
+            if kind == self._STOP:
+                self._closed = True
+        return future
+
+    def add(self, model):
+        """
+        Queue insert or update of model. Future resolves to model pk after commit.
+        SQL is built right away, so later changes of model need another `add`.
+        Model cannot be added again until its insert is committed (its pk is not known before).
+        """
+        if getattr(model, '_insert_pending', False):
+            raise dbIntegrityError(f'Insert of {model} is not committed yet, wait for its future.')
+        sql, values = self.db._get_add_sql(model)
+        if not model.fetched_from_db and sql:
+            model._insert_pending = True
+        # changes made after this call mark model for update again
+        model.needs_update_in_db = False
+        try:
+            return self._put(self._MODEL, model, sql, values)
+        except DatabaseClosedError:
+            model._insert_pending = False
+            model.needs_update_in_db = True
+            raise
+
+    def execute(self, sql, params=None):
+        """Queue raw sql statement. Future resolves to lastrowid after commit."""
+        return self._put(self._SQL, sql, params)
+
+    def flush(self, timeout=None):
+        """Block until everything queued before the call is committed."""
+        self._put(self._FLUSH).result(timeout)
+
+    def close(self, timeout=None):
+        """Commit queued writes, stop writer thread and close its connection."""
+        try:
+            stopped = self._put(self._STOP)
+        except DatabaseClosedError:
+            return
+        stopped.result(timeout)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _next_batch(self):
+        """Block for first item and collect more until batch is full or delay is over."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch and batch[-1][0] in (self._MODEL, self._SQL):
+            timeout = deadline - time.monotonic()
+            try:
+                # past deadline only take what is already queued
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        cursor = self._con.cursor()
+        while True:
+            batch = self._next_batch()
+            with self._con_lock:
+                done = self._write_batch(cursor, batch)
+            for future, model, pk in done:
+                if model is not None:
+                    # pk setter marks model for update, keep flag set by changes made after `add`
+                    needs_update_in_db = model.needs_update_in_db
+                    model.pk = pk
+                    model.fetched_from_db = True
+                    model.needs_update_in_db = needs_update_in_db
+                    model._insert_pending = False
+                future.set_result(pk)
+            # flush and stop markers are last items of a batch, everything before them is committed
+            kind, future, _ = batch[-1]
+            if kind == self._FLUSH:
+                future.set_result(None)
+            elif kind == self._STOP:
+                cursor.close()
+                if self._owns_con:
+                    self._con.close()
+                self._fail_queued()
+                future.set_result(None)
+                return
+
+    def _fail_queued(self):
+        """Fail futures of anything left in queue after writer stopped."""
+        while True:
+            try:
+                kind, future, args = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._release(kind, args)
+            future.set_exception(DatabaseClosedError('Writer is closed'))
+
+    def _release(self, kind, args):
+        """Allow model of failed write to be added again."""
+        if kind == self._MODEL:
+            args[0]._insert_pending = False
+            args[0].needs_update_in_db = True
+
+    def _write_batch(self, cursor, batch):
+        """Execute batch in one transaction, return (future, model, pk) to resolve."""
+        # (future, model, rowid) to resolve once batch is committed
+        done = []
+        for kind, future, args in batch:
+            if kind not in (self._MODEL, self._SQL):
+                continue
+            try:
+                if kind == self._MODEL:
+                    model, sql, values = args
+                    if not sql:
+                        done.append((future, None, model.pk))
+                        continue
+                    cursor.execute(sql, values)
+                    done.append((future, model, model.pk or cursor.lastrowid))
+                else:
+                    sql, params = args
+                    cursor.execute(sql, params or [])
+                    done.append((future, None, cursor.lastrowid))
+            except sqlite3.Error as e:
+                # failed statement is rolled back alone, rest of the batch goes on
+                self._release(kind, args)
+                future.set_exception(QueryError(e))
+            except Exception as e:
+                self._release(kind, args)
+                future.set_exception(e)
+        try:
+            self._con.commit()
+        except sqlite3.Error as e:
+            self._con.rollback()
+            for future, model, _ in done:
+                if model is not None:
+                    model._insert_pending = False
+                    model.needs_update_in_db = True
+                future.set_exception(QueryError(e))
+            done = []
+        return done
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sqlite_orm.db import Database
+from sqlite_orm.exceptions import QueryError
+from sqlite_orm.fields import IntField, TextField
+
+
+class BackupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, 'source.sqlite3')
+        self.db = Database(self.filename)
+
+        class New(self.db.BaseModel):
+            __tablename__ = 'new_table'
+            field1 = TextField()
+            field2 = IntField()
+            field3 = IntField(pk=True)
+
+        self.New = New
+        self.db.create_all()
+        [self.db.add(New(field1=f'Row {i}', field2=i)) for i in range(200)]
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def count_rows(self, filename):
+        con = sqlite3.connect(filename)
+        count = con.execute('SELECT COUNT(*) FROM new_table').fetchone()[0]
+        con.close()
+        return count
+
+    def testIncrementalBackup(self):
+        target = os.path.join(self.tmpdir.name, 'backup.sqlite3')
+        steps = []
+        future = self.db.backup(target, pages_per_step=1, sleep=0, progress=lambda *args: steps.append(args))
+        self.assertIsNone(future.result(timeout=10))
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1][1], 0)
+        self.assertEqual(self.count_rows(target), 200)
+
+    def testBackupToDatabase(self):
+        memory_db = Database()
+        self.db.backup(memory_db, pages_per_step=-1).result(timeout=10)
+        self.assertEqual(len(memory_db.query(self.New).all()), 200)
+        # in-memory source is copied on the calling thread
+        memory_target = os.path.join(self.tmpdir.name, 'from_memory.sqlite3')
+        memory_db.backup(memory_target).result(timeout=10)
+        memory_db.close()
+        self.assertEqual(self.count_rows(memory_target), 200)
+
+    def testInMemoryMirror(self):
+        self.db.close()
+        self.db = Database(self.filename, mirror_in_memory=True)
+        self.assertEqual(len(self.db.query(self.New).all()), 200)
+        self.db.add(self.New(field1='New row', field2=200))
+        # changes reach the file only on flush
+        self.assertEqual(self.count_rows(self.filename), 200)
+        self.db.flush()
+        self.assertEqual(self.count_rows(self.filename), 201)
+        self.db.add(self.New(field1='Another row', field2=201))
+        self.db.close()
+        self.assertEqual(self.count_rows(self.filename), 202)
+        self.db = Database(self.filename)
+
+    def testMirrorFlushWithPendingTransaction(self):
+        self.db.close()
+        self.db = Database(self.filename, mirror_in_memory=True)
+        self.db._execute('INSERT INTO new_table VALUES (?, ?, ?)', ['Pending', 1, None])
+        with self.assertRaises(QueryError):
+            self.db.flush()
+        self.db.con.commit()
+        self.db.flush()
+        self.assertEqual(self.count_rows(self.filename), 201)
+        # close discards uncommitted changes instead of hanging
+        self.db._execute('INSERT INTO new_table VALUES (?, ?, ?)', ['Pending', 2, None])
+        self.db.close()
+        self.assertEqual(self.count_rows(self.filename), 201)
+        self.db = Database(self.filename)
+
+    def testMirrorFlushTimeout(self):
+        self.db.close()
+        self.db = Database(self.filename, mirror_in_memory=True)
+        locker = sqlite3.connect(self.filename, isolation_level=None)
+        locker.execute('BEGIN EXCLUSIVE')
+        with self.assertRaises(QueryError):
+            self.db.flush(timeout=0.2)
+        locker.execute('ROLLBACK')
+        locker.close()
+        self.db.flush()
+
+    def testCloseAfterFailedFlush(self):
+        self.db.close()
+        self.db = Database(self.filename, mirror_in_memory=True)
+        locker = sqlite3.connect(self.filename, isolation_level=None)
+        locker.execute('BEGIN EXCLUSIVE')
+        self.db.flush = lambda: Database.flush(self.db, timeout=0.2)
+        with self.assertRaises(QueryError):
+            self.db.close()
+        locker.execute('ROLLBACK')
+        locker.close()
+        # connections are closed anyway
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.db._disk_con.execute('SELECT 1')
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.db.con.execute('SELECT 1')
+        self.db = Database(self.filename)
+
+    def testBackupToSameThreadDatabase(self):
+        memory_db = Database()
+        future = self.db.backup(memory_db)
+        # target connection belongs to this thread so copy is done right away
+        self.assertTrue(future.done())
+        self.assertIsNone(future.result())
+        self.assertEqual(len(memory_db.query(self.New).all()), 200)
+        memory_db.close()
@@ -1,6 +1,7 @@
 import unittest
 
 from sqlite_orm.db import Database
+from sqlite_orm.exceptions import QueryError
 from sqlite_orm.fields import IntField, TextField, ForeignKeyField
 
 
@@ -166,3 +167,143 @@ class QueryingTest(unittest.TestCase):
         m21_db_dict = self.db.query(self.New).join(self.New2, join_on=['field1', 'field5']).select(self.New2, fields=['field5']).first()
         self.assertEqual(len(m21_db_dict), 1)
         self.assertDictEqual(m21_db_dict, {'new_table_2.field5': 'Aaaa'})
+
+    def testRowModes(self):
+        m11 = self.New(field1='Aaaa', field2=15, field3=3)
+        m12 = self.New(field1='Bbbb', field2=30, field3=1)
+        m21 = self.New2(field4=m11, field5='Cccc')
+        [self.db.add(model) for model in [m11, m12, m21]]
+
+        rows = self.db.query(self.New).select(self.New, fields=['field2', 'field1']).tuples().all()
+        self.assertEqual(rows, [(30, 'Bbbb'), (15, 'Aaaa')])
+        row = self.db.query(self.New).filter(field1='Aaaa').namedtuples().first()
+        self.assertEqual((row.field1, row.field2, row.field3), ('Aaaa', 15, 3))
+        rows = self.db.query(self.New).join(self.New2).select(self.New2, fields=['field5']).namedtuples().all()
+        self.assertEqual(rows[0].field5, 'Cccc')
+        self.assertIs(type(rows[0]), type(
+            self.db.query(self.New).join(self.New2).select(self.New2, fields=['field5']).namedtuples().first()
+        ))
+        values = self.db.query(self.New).select(self.New, fields=['field2']).order_by('-field2').scalars().all()
+        self.assertEqual(values, [30, 15])
+
+    def testExplain(self):
+        plan = self.db.query(self.New).filter(field1='Aaaa').order_by('field2').explain()
+        self.assertTrue(any(node.full_scan for node in plan.nodes))
+        self.assertTrue(any(node.temp_btree for node in plan.nodes))
+        self.assertEqual(plan.index_suggestions, [
+            'CREATE INDEX IF NOT EXISTS new_table_field1_idx ON new_table(field1);'
+        ])
+        self.assertIn('full scan of new_table', plan.warnings[0])
+        self.assertIn('new_table', str(plan))
+
+        # lookups by INTEGER PRIMARY KEY need no index
+        plan = self.db.query(self.New).filter(field3=1).explain()
+        self.assertFalse(any(node.full_scan for node in plan.nodes))
+        self.assertEqual(plan.index_suggestions, [])
+
+    def testCollectPlans(self):
+        m11 = self.New(field1='Aaaa', field2=15, field3=3)
+        m21 = self.New2(field4=m11, field5='Cccc')
+        [self.db.add(model) for model in [m11, m21]]
+
+        with self.db.collect_plans() as collector:
+            self.db.query(self.New).get(3)
+            self.db.query(self.New).join(self.New2).select(self.New2, fields=['field5']).filter(field2=15).all()
+            self.db.query(self.New2).filter(field5='Cccc').first()
+        self.db.query(self.New).all()
+        self.assertEqual(len(collector.plans), 3)
+        self.assertEqual(len(collector.flagged()), 2)
+        suggestions = collector.index_suggestions()
+        self.assertIn('CREATE INDEX IF NOT EXISTS new_table_2_field5_idx ON new_table_2(field5);', suggestions)
+        for suggestion in suggestions:
+            self.db._execute(suggestion, commit=True)
+        self.assertEqual(self.db.query(self.New2).filter(field5='Cccc').explain().index_suggestions, [])
+
+    def testNestedCollectPlans(self):
+        with self.db.collect_plans() as outer:
+            self.db.query(self.New).all()
+            with self.db.collect_plans() as inner:
+                self.db.query(self.New2).all()
+            self.db.query(self.New).first()
+        self.assertEqual(len(inner.plans), 1)
+        self.assertEqual(len(outer.plans), 3)
+        self.assertIsNone(self.db._plan_collector)
+
+
+class SearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database()
+
+        class Article(self.db.BaseModel):
+            __tablename__ = 'article_table'
+            title = TextField(searchable=True)
+            body = TextField(name='body_text', searchable=True)
+            views = IntField()
+            article_id = IntField(pk=True)
+
+        self.Article = Article
+        self.db.create_all()
+        self.articles = [
+            Article(title='SQLite internals', body='Pages, btrees and the pager.', views=10),
+            Article(title='Python tips', body='Use sqlite for small projects, sqlite is fast.', views=5),
+            Article(title='Cooking', body='Nothing about databases here.', views=1),
+        ]
+        [self.db.add(model) for model in self.articles]
+
+    def tearDown(self):
+        self.db.close()
+
+    def testSearch(self):
+        found = self.db.query(self.Article).search('sqlite').all()
+        self.assertEqual(sorted(model.pk for model in found), [1, 2])
+        found = self.db.query(self.Article).search('body_text: databases').all()
+        self.assertEqual([model.title for model in found], ['Cooking'])
+        found = self.db.query(self.Article).search('sqlite').filter(views=5).all()
+        self.assertEqual([model.pk for model in found], [2])
+
+    def testSearchIndexFollowsUpdatesAndDeletes(self):
+        article = self.articles[2]
+        article.body = 'Now it is about sqlite too.'
+        self.db.add(article)
+        found = self.db.query(self.Article).search('sqlite').all()
+        self.assertEqual(sorted(model.pk for model in found), [1, 2, 3])
+        self.db._execute('DELETE FROM article_table WHERE article_id=?', [1], commit=True)
+        found = self.db.query(self.Article).search('sqlite').all()
+        self.assertEqual(sorted(model.pk for model in found), [2, 3])
+        self.assertEqual(self.db.query(self.Article).search('pager').all(), [])
+
+    def testSnippet(self):
+        found = self.db.query(self.Article).search('projects').snippet('body', tokens=4).first()
+        self.assertIn('[projects]', found.body_snippet)
+        found = self.db.query(self.Article).search('projects').snippet('body') \
+            .select(self.Article, fields=['title']).first()
+        self.assertEqual(found['article_table.title'], 'Python tips')
+        self.assertIn('[projects]', found['article_table.body_snippet'])
+
+    def testSearchOnNotSearchableModel(self):
+        class Plain(self.db.BaseModel):
+            __tablename__ = 'plain_table'
+            field1 = TextField()
+
+        with self.assertRaises(QueryError):
+            self.db.query(Plain).search('anything')
+
+    def testSearchIndexesExistingRows(self):
+        class Existing(self.db.BaseModel):
+            __tablename__ = 'existing_table'
+            field1 = TextField()
+
+        self.db.create_all()
+        [self.db.add(Existing(field1=text)) for text in ['hello world', 'goodbye']]
+
+        # same table declared searchable later, e.g. in next version of application
+        class ExistingSearchable(self.db.BaseModel):
+            __tablename__ = 'existing_table'
+            field1 = TextField(searchable=True)
+
+        self.db.create_all()
+        self.assertEqual([model.field1 for model in self.db.query(ExistingSearchable).search('hello').all()],
+                         ['hello world'])
+        self.db.rebuild_search_index(ExistingSearchable)
+        self.assertEqual(len(self.db.query(ExistingSearchable).search('goodbye').all()), 1)
@@ -0,0 +1,150 @@
+import unittest
+
+from sqlite_orm.exceptions import NotFoundError, dbIntegrityError
+from sqlite_orm.fields import IntField, TextField
+from sqlite_orm.sharding import ShardedDatabase, HashShardKey, RangeShardKey
+
+
+class ShardingTest(unittest.TestCase):
+
+    def setUp(self):
+        # three independent in-memory databases
+        self.db = ShardedDatabase([':memory:', ':memory:', ':memory:'])
+
+        class Sharded(self.db.BaseModel):
+            __tablename__ = 'sharded_table'
+            __shard_key__ = RangeShardKey('field3', bounds=[10, 20])
+            field1 = TextField()
+            field2 = IntField()
+            field3 = IntField(pk=True)
+
+        self.Sharded = Sharded
+
+        class Hashed(self.db.BaseModel):
+            __tablename__ = 'hashed_table'
+            __shard_key__ = HashShardKey('field5')
+            field4 = IntField(pk=True)
+            field5 = TextField()
+
+        self.Hashed = Hashed
+
+        self.db.create_all()
+        self.models = [
+            Sharded(field1='Aaaa', field2=15, field3=3),
+            Sharded(field1='Bbbb', field2=30, field3=12),
+            Sharded(field1='Aaaa', field2=5, field3=25),
+            Sharded(field1='Cccc', field2=20, field3=14),
+        ]
+        [self.db.add(model) for model in self.models]
+
+    def tearDown(self):
+        self.db.close()
+
+    def testRangeRouting(self):
+        counts = [len(shard.query(self.Sharded).all()) for shard in self.db.shards]
+        self.assertEqual(counts, [1, 2, 1])
+
+    def testHashRoutingIsStable(self):
+        for pk, name in enumerate(['a', 'b', 'c', 'd', 'e'], 1):
+            self.db.add(self.Hashed(field4=pk, field5=name))
+        for name in ['a', 'b', 'c', 'd', 'e']:
+            shard = self.db.shard_for(self.Hashed, name)
+            self.assertEqual(shard.query(self.Hashed).filter(field5=name).first().field5, name)
+            self.assertEqual(self.db.query(self.Hashed).filter(field5=name).first().field5, name)
+
+    def testHashOfEqualNumbers(self):
+        key = HashShardKey('field5')
+        shards = {key.shard_for(value, 7) for value in [1, 1.0, True]}
+        self.assertEqual(len(shards), 1)
+        self.assertEqual(key.shard_for(0.0, 7), key.shard_for(False, 7))
+
+    def testGetByShardKey(self):
+        m_db = self.db.query(self.Sharded).get(25)
+        self.assertDictEqual(m_db._data, self.models[2]._data)
+        with self.assertRaises(NotFoundError):
+            self.db.query(self.Sharded).get(26)
+
+    def testFanOutFilter(self):
+        m_db = self.db.query(self.Sharded).filter(field1='Aaaa').all()
+        self.assertEqual(sorted(model.pk for model in m_db), [3, 25])
+
+    def testMergeOrderAndLimit(self):
+        m_db = self.db.query(self.Sharded).order_by('-field2').limit(3).all()
+        self.assertEqual([model.field2 for model in m_db], [30, 20, 15])
+        m_db_dicts = self.db.query(self.Sharded).select(self.Sharded, fields=['field2']) \
+            .order_by('field2').limit(2).all()
+        self.assertEqual(m_db_dicts, [{'sharded_table.field2': 5}, {'sharded_table.field2': 15}])
+        self.assertEqual(self.db.query(self.Sharded).order_by('field2').first().pk, 25)
+
+    def testMergeRowModes(self):
+        rows = self.db.query(self.Sharded).select(self.Sharded, fields=['field1', 'field2']) \
+            .order_by('field2').tuples().all()
+        self.assertEqual(rows, [('Aaaa', 5), ('Aaaa', 15), ('Cccc', 20), ('Bbbb', 30)])
+        values = self.db.query(self.Sharded).select(self.Sharded, fields=['field2']) \
+            .order_by('-field2').limit(2).scalars().all()
+        self.assertEqual(values, [30, 20])
+
+    def testShardedModelNeedsExplicitPk(self):
+        with self.assertRaises(ValueError):
+            self.db.add(self.Hashed(field5='a'))
+
+        class NoPk(self.db.BaseModel):
+            __tablename__ = 'no_pk_sharded_table'
+            __shard_key__ = HashShardKey('field6')
+            field6 = TextField()
+
+        with self.assertRaises(ValueError):
+            self.db.add(NoPk(field6='a'))
+
+        [self.db.add(self.Hashed(field4=pk, field5=name)) for pk, name in enumerate('abcdef', 1)]
+        self.assertEqual(self.db.query(self.Hashed).get(1).field5, 'a')
+        self.assertEqual(sorted(model.pk for model in self.db.query(self.Hashed).all()), [1, 2, 3, 4, 5, 6])
+
+    def testChangedShardKeyIsRejected(self):
+        model = self.db.query(self.Sharded).get(3)
+        model.field3 = 13
+        with self.assertRaises(dbIntegrityError):
+            self.db.add(model)
+        model = self.db.query(self.Sharded).filter(field1='Bbbb').first()
+        model.field3 = 2
+        with self.assertRaises(dbIntegrityError):
+            self.db.add(model)
+        model = self.db.query(self.Sharded).get(12)
+        model.field2 = 31
+        self.db.add(model)
+        self.assertEqual(self.db.query(self.Sharded).get(12).field2, 31)
+
+    def testSearchMergedByRank(self):
+        class Document(self.db.BaseModel):
+            __tablename__ = 'sharded_document_table'
+            __shard_key__ = RangeShardKey('document_id', bounds=[10, 20])
+            document_id = IntField(pk=True)
+            text = TextField(searchable=True)
+
+        self.db.create_all()
+        self.db.add(Document(document_id=1, text='sqlite mentioned once among many other unrelated words here'))
+        self.db.add(Document(document_id=15, text='sqlite sqlite sqlite'))
+        found = self.db.query(Document).search('sqlite').limit(1).all()
+        self.assertEqual([model.pk for model in found], [15])
+        self.assertFalse(hasattr(found[0], 'search_rank'))
+
+        # merged results have the same shape as results of a single database
+        single = self.db.shards[1]
+        select = ['document_id']
+        sharded_rows = self.db.query(Document).search('sqlite').select(Document, fields=select).tuples().all()
+        self.assertEqual(sharded_rows, [(15,), (1,)])
+        self.assertEqual(single.query(Document).search('sqlite').select(Document, fields=select).tuples().all(),
+                         [(15,)])
+        sharded_rows = self.db.query(Document).search('sqlite').select(Document, fields=select).all()
+        self.assertEqual(sharded_rows, [{'sharded_document_table.document_id': 15},
+                                        {'sharded_document_table.document_id': 1}])
+        self.assertEqual(single.query(Document).search('sqlite').select(Document, fields=select).all(),
+                         [{'sharded_document_table.document_id': 15}])
+        sharded_rows = self.db.query(Document).search('sqlite').namedtuples().all()
+        single_rows = single.query(Document).search('sqlite').namedtuples().all()
+        self.assertEqual(sharded_rows[0]._fields, single_rows[0]._fields)
+        self.assertEqual(sharded_rows[0], single_rows[0])
+        sharded_values = self.db.query(Document).search('sqlite').select(Document, fields=select).scalars().all()
+        self.assertEqual(sharded_values, [15, 1])
+        self.assertEqual(single.query(Document).search('sqlite').select(Document, fields=select).scalars().all(),
+                         [15])
@@ -0,0 +1,97 @@
+import unittest
+
+from sqlite_orm.db import Database
+from sqlite_orm.exceptions import NotFoundError
+from sqlite_orm.fields import IntField, TextField, ForeignKeyField, CountField, SumField
+
+
+class SummaryTest(unittest.TestCase):
+
+    def setUp(self):
+        # initialize in-memory database
+        self.db = Database()
+
+        class Customer(self.db.BaseModel):
+            __tablename__ = 'customer_table'
+            name = TextField()
+            customer_id = IntField(pk=True)
+
+        self.Customer = Customer
+
+        class Order(self.db.BaseModel):
+            __tablename__ = 'order_table'
+            customer = ForeignKeyField(to=Customer)
+            amount = IntField()
+
+        self.Order = Order
+
+        class CustomerStats(self.db.BaseModel):
+            __tablename__ = 'customer_stats_table'
+            __summary_of__ = Order
+            __group_by__ = 'customer'
+            customer = IntField(pk=True)
+            orders = CountField()
+            total = SumField('amount')
+
+        self.CustomerStats = CustomerStats
+
+        self.db.create_all()
+        self.customers = [Customer(name='Aaaa', customer_id=1), Customer(name='Bbbb', customer_id=2)]
+        [self.db.add(model) for model in self.customers]
+        self.orders = [
+            Order(customer=self.customers[0], amount=10),
+            Order(customer=self.customers[0], amount=15),
+            Order(customer=self.customers[1], amount=7),
+        ]
+        [self.db.add(model) for model in self.orders]
+
+    def tearDown(self):
+        self.db.close()
+
+    def assertStats(self, customer_pk, orders, total):
+        stats = self.db.query(self.CustomerStats).get(customer_pk)
+        self.assertEqual((stats.orders, stats.total), (orders, total))
+
+    def testInsertUpdatesSummary(self):
+        self.assertStats(1, 2, 25)
+        self.assertStats(2, 1, 7)
+
+    def testUpdateAndDeleteUpdateSummary(self):
+        self.db._execute('UPDATE order_table SET amount=20 WHERE rowid=1', commit=True)
+        self.assertStats(1, 2, 35)
+        self.db._execute('UPDATE order_table SET customer=2 WHERE rowid=2', commit=True)
+        self.assertStats(1, 1, 20)
+        self.assertStats(2, 2, 22)
+        self.db._execute('DELETE FROM order_table WHERE rowid=1', commit=True)
+        # empty groups are removed
+        with self.assertRaises(NotFoundError):
+            self.db.query(self.CustomerStats).get(1)
+
+    def testRefresh(self):
+        self.db._execute('DELETE FROM customer_stats_table', commit=True)
+        self.db.refresh(self.CustomerStats)
+        self.assertStats(1, 2, 25)
+        self.assertStats(2, 1, 7)
+
+    def testDropSummaryKeepsSourceWritable(self):
+        self.db.drop(self.CustomerStats)
+        self.db.add(self.Order(customer=self.customers[1], amount=1))
+        self.assertEqual(len(self.db.query(self.Order).all()), 4)
+
+    def testSummaryOfFilledTable(self):
+        class AmountStats(self.db.BaseModel):
+            __tablename__ = 'amount_stats_table'
+            __summary_of__ = self.Order
+            __group_by__ = 'amount'
+            amount = IntField(pk=True)
+            orders = CountField()
+
+        self.db.create_all()
+        self.assertEqual(self.db.query(AmountStats).get(15).orders, 1)
+        self.db.add(self.Order(customer=self.customers[1], amount=15))
+        self.assertEqual(self.db.query(AmountStats).get(15).orders, 2)
+        # existing summary is not rebuilt by create_all
+        self.db._execute('DELETE FROM customer_stats_table', commit=True)
+        self.db.create_all()
+        with self.assertRaises(NotFoundError):
+            self.db.query(self.CustomerStats).get(1)
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from sqlite_orm.db import Database
+from sqlite_orm.exceptions import QueryError, DatabaseClosedError, dbIntegrityError
+from sqlite_orm.fields import IntField, TextField
+
+
+class WriterTest(unittest.TestCase):
+
+    def setUp(self):
+        # writer uses its own connection so database should live in a file
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'writer.sqlite3'))
+
+        class New(self.db.BaseModel):
+            __tablename__ = 'new_table'
+            field1 = TextField()
+            field2 = IntField()
+            field3 = IntField(pk=True)
+
+        self.New = New
+        self.db.create_all()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def testBatchedAdd(self):
+        writer = self.db.writer(max_batch=10, max_delay_ms=50)
+        models = [self.New(field1=f'Row {i}', field2=i) for i in range(25)]
+        futures = [writer.add(model) for model in models]
+        writer.flush()
+        self.assertEqual([future.result() for future in futures], list(range(1, 26)))
+        self.assertEqual([model.pk for model in models], list(range(1, 26)))
+        self.assertEqual(len(self.db.query(self.New).all()), 25)
+
+        models[0].field1 = 'Updated'
+        self.assertEqual(writer.add(models[0]).result(), 1)
+        writer.close()
+        self.assertEqual(self.db.query(self.New).get(1).field1, 'Updated')
+
+    def testFailedStatementDoesNotFailBatch(self):
+        with self.db.writer(max_batch=10, max_delay_ms=50) as writer:
+            ok = writer.execute('INSERT INTO new_table VALUES (?, ?, ?)', ['Aaaa', 1, 1])
+            failed = writer.execute('INSERT INTO no_such_table VALUES (?)', [1])
+            duplicate = writer.add(self.New(field1='Bbbb', field2=2, field3=1))
+            also_ok = writer.add(self.New(field1='Cccc', field2=3))
+        self.assertEqual(ok.result(), 1)
+        self.assertEqual(also_ok.result(), 2)
+        with self.assertRaises(QueryError):
+            failed.result()
+        with self.assertRaises(QueryError):
+            duplicate.result()
+        self.assertEqual(len(self.db.query(self.New).all()), 2)
+        with self.assertRaises(DatabaseClosedError):
+            writer.add(self.New(field1='Dddd', field2=4))
+
+    def testInMemoryDatabaseNeedsSharedConnection(self):
+        db = Database()
+        with self.assertRaises(ValueError):
+            db.writer()
+        db.close()
+
+    def testConcurrentAddAndClose(self):
+        writer = self.db.writer(max_batch=10, max_delay_ms=1)
+        futures, errors = [], []
+
+        def produce():
+            for i in range(200):
+                try:
+                    futures.append(writer.add(self.New(field1='Aaaa', field2=i)))
+                except DatabaseClosedError:
+                    errors.append(i)
+                    return
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        writer.close()
+        thread.join()
+        # every accepted write is resolved, nothing hangs after close
+        for future in futures:
+            self.assertIsInstance(future.result(timeout=5), int)
+        self.assertEqual(len(self.db.query(self.New).all()), len(futures))
+
+    def testSharedConnection(self):
+        db = Database(check_same_thread=False)
+        db.create_all()
+        with db.writer(max_batch=50, max_delay_ms=20) as writer:
+            futures = [writer.add(self.New(field1='Aaaa', field2=i)) for i in range(100)]
+            for i in range(20):
+                db._execute('INSERT INTO new_table VALUES (?, ?, ?)', ['Bbbb', i, None], commit=True)
+        self.assertTrue(all(isinstance(future.result(), int) for future in futures))
+        self.assertEqual(len(db.query(self.New).all()), 120)
+        db.close()
+
+    def testModelSnapshotAndPendingInsert(self):
+        with self.db.writer(max_batch=10, max_delay_ms=200) as writer:
+            model = self.New(field1='Aaaa', field2=1)
+            future = writer.add(model)
+            # change after add is not part of queued insert
+            model.field1 = 'Bbbb'
+            with self.assertRaises(dbIntegrityError):
+                writer.add(model)
+            self.assertEqual(future.result(), 1)
+            self.assertTrue(model.needs_update_in_db)
+            self.assertEqual(self.db.query(self.New).get(1).field1, 'Aaaa')
+            # once insert is committed model can be added again as update
+            self.assertEqual(writer.add(model).result(), 1)
+            self.assertFalse(model.needs_update_in_db)
+        rows = [(model.pk, model.field1) for model in self.db.query(self.New).all()]
+        self.assertEqual(rows, [(1, 'Bbbb')])